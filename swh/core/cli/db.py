@@ -4,10 +4,12 @@
 # License: GNU General Public License version 3, or any later version
 # See top-level LICENSE file for more information
 
+import functools
 import logging
 from os import environ
 from subprocess import CalledProcessError
-from typing import Any, Dict, List, Optional, Tuple
+import sys
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
 import warnings
 
 import click
@@ -15,7 +17,8 @@ import click
 from swh.core.cli import CONTEXT_SETTINGS
 from swh.core.cli import swh as swh_cli_group
 
-warnings.filterwarnings("ignore")  # noqa prevent psycopg from side-tracking us
+# prevent psycopg from side-tracking us
+warnings.filterwarnings("ignore", module="psycopg2")
 
 
 logger = logging.getLogger(__name__)
@@ -32,13 +35,25 @@ logger = logging.getLogger(__name__)
 @click.pass_context
 def db(ctx, config_file):
     """Software Heritage database generic tools."""
-    from swh.core.config import read as config_read
-
     ctx.ensure_object(dict)
     if config_file is None:
         config_file = environ.get("SWH_CONFIG_FILENAME")
-    cfg = config_read(config_file)
-    ctx.obj["config"] = cfg
+    # the configuration file is only read when needed, see _get_config()
+    ctx.obj["config_file"] = config_file
+
+
+def _get_config(ctx) -> Dict[str, Any]:
+    """Return the configuration of the 'swh db' command
+
+    The configuration file is read on first call only, so that commands given
+    an explicit database connection string do not have to load it.
+    """
+    if "config" not in ctx.obj:
+        from swh.core.config import read as config_read
+
+        config_file = ctx.obj.get("config_file")
+        ctx.obj["config"] = config_read(config_file) if config_file else {}
+    return ctx.obj["config"]
 
 
 @db.command(name="create", context_settings=CONTEXT_SETTINGS)
@@ -84,7 +99,7 @@ def db_create(ctx, module, dbname, template):
     from swh.core.db.db_utils import create_database_for_package
 
     args = handle_cmd_args(
-        cfg=ctx.obj["config"],
+        cfg=_get_config(ctx) if dbname is None else {},
         module=module,
         do_all=False,
         dbname=dbname,
@@ -120,9 +135,22 @@ def db_create(ctx, module, dbname, template):
     default=False,
     is_flag=True,
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of databases to process concurrently (mostly useful with --all)",
+)
 @click.pass_context
 def db_init_admin(
-    ctx, module: str, dbname: Optional[str], initialize_all: bool, module_is_path: bool
+    ctx,
+    module: str,
+    dbname: Optional[str],
+    initialize_all: bool,
+    module_is_path: bool,
+    jobs: int,
 ) -> None:
     """Execute superuser-level initialization steps (e.g pg extensions, admin functions,
     ...)
@@ -214,17 +242,19 @@ def db_init_admin(
     from swh.core.db.db_utils import init_admin_extensions
 
     args = handle_cmd_args(
-        cfg=ctx.obj["config"],
+        cfg=_get_config(ctx) if dbname is None or initialize_all else {},
         module=module,
         do_all=initialize_all,
         dbname=dbname,
         is_path=module_is_path,
     )
 
-    for package, fullmodule, _, dbname, cfg in args:
+    def init_admin_one(package, fullmodule, backend_class, dbname, cfg):
         logger.debug("db_init_admin %s:%s dbname=%s", package, cfg["cls"], dbname)
         init_admin_extensions(f"{package}:{cfg['cls']}", dbname)
 
+    _run_all(ctx, init_admin_one, args, jobs=jobs)
+
 
 @db.command(name="list", context_settings=CONTEXT_SETTINGS)
 @click.argument("module", required=False)
@@ -233,11 +263,14 @@ def db_list(ctx, module):
     """List found DB configs under the <module> in the config file"""
     from swh.core.config import list_db_config_entries
 
-    cfg = ctx.obj["config"]
-    for swhmod, path, dbcfg, db in list_db_config_entries(cfg):
-        if module and module != swhmod:
-            continue
-        print(path, dbcfg["cls"], db)
+    lines = [
+        f"{path} {dbcfg['cls']} {db}"
+        for swhmod, path, dbcfg, db in list_db_config_entries(
+            _get_config(ctx), only_module=module or None
+        )
+    ]
+    if lines:
+        click.echo("\n".join(lines))
 
 
 @db.command(name="init", context_settings=CONTEXT_SETTINGS)
@@ -272,9 +305,17 @@ def db_list(ctx, module):
     default=False,
     is_flag=True,
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of databases to process concurrently (mostly useful with --all)",
+)
 @click.pass_context
 def db_init(
-    ctx, module, dbname, flavor, module_config_key, initialize_all, module_is_path
+    ctx, module, dbname, flavor, module_config_key, initialize_all, module_is_path, jobs
 ):
     """Initialize a database for the Software Heritage <module>.
 
@@ -320,36 +361,28 @@ def db_init(
     # initializing several db at once... this case should raise an error
 
     args = handle_cmd_args(
-        cfg=ctx.obj["config"],
+        cfg=_get_config(ctx) if dbname is None or initialize_all else {},
         module=module,
         do_all=initialize_all,
         dbname=dbname,
         is_path=module_is_path,
     )
 
-    for package, fullmodule, backend_class, dbname, cfg in args:
+    def init_one(package, fullmodule, backend_class, dbname, cfg):
         initialize_one(package, fullmodule, backend_class, flavor, dbname, cfg)
 
+    _run_all(ctx, init_one, args, jobs=jobs)
+
 
 def initialize_one(package, module, backend_class, flavor, dbname, cfg):
-    from swh.core.db.db_utils import (
-        get_database_info,
-        import_swhmodule,
-        populate_database_for_package,
-        swh_set_db_version,
-    )
+    from swh.core.db.db_utils import populate_database_for_package, swh_set_db_version
 
     # identify the datastore version first, otherwise if we start populating
     # the database but the backend cannot be initialized to retrieve the
     # current version, then we are in a broken state where the database is
     # mostly set up but the version; which is then used to decide whether the
     # db is initialized or not for any subsequent 'swh db' command...
-    datastore_factory = getattr(import_swhmodule(module), "get_datastore", None)
-    if datastore_factory is None and backend_class is not None:
-
-        def datastore_factory(cls, **cfg):
-            return backend_class(**cfg)
-
+    datastore_factory = get_datastore_factory(module, backend_class)
     code_version = None
     if datastore_factory:
         # TODO: try not to instantiate the backend class; most of the time, the
@@ -391,29 +424,17 @@ def initialize_one(package, module, backend_class, flavor, dbname, cfg):
         # let's do it; instantiate the data source to retrieve the current
         # (expected) db version
         swh_set_db_version(dbname, code_version, desc="DB initialization")
-
-    dbversion = get_database_info(dbname)[1]
-    if dbversion is None:
-        click.secho(
-            "ERROR: database for {} {}{} BUT db version could not be set".format(
-                module,
-                "initialized" if initialized else "exists",
-                f" (flavor {dbflavor})" if dbflavor is not None else "",
-            ),
-            fg="red",
-            bold=True,
-        )
-    else:
-        click.secho(
-            "DONE database for {} {}{} at version {}".format(
-                module,
-                "initialized" if initialized else "exists",
-                f" (flavor {dbflavor})" if dbflavor is not None else "",
-                dbversion,
-            ),
-            fg="green",
-            bold=True,
-        )
+        # no need to read it back from the database, swh_set_db_version raises
+        # if the version could not be written
+        dbversion = code_version
+
+    status = "initialized" if initialized else "exists"
+    flavor_str = f" (flavor {dbflavor})" if dbflavor is not None else ""
+    click.secho(
+        f"DONE database for {module} {status}{flavor_str} at version {dbversion}",
+        fg="green",
+        bold=True,
+    )
 
     if flavor is not None and dbflavor != flavor:
         click.secho(
@@ -448,7 +469,7 @@ def db_shell(ctx, module, dbname, module_config_key):
         # use the db cnx from the config file; the expected config entry is either the given
         # module_config_key or defaulting to the module name (if module_config_key is not
         # provided)
-        cfg = ctx.obj["config"].get(module_config_key or module, {})
+        cfg = _get_config(ctx).get(module_config_key or module, {})
         dbname, cfg = get_dburl_from_config(cfg)
 
     if not dbname:
@@ -462,7 +483,7 @@ def db_shell(ctx, module, dbname, module_config_key):
     )
     logger.info("Opening database shell for %r", dbname_censored)
 
-    run(["psql", dbname])
+    run(["psql", dbname], close_fds=False)
 
 
 @db.command(name="version", context_settings=CONTEXT_SETTINGS)
@@ -491,9 +512,19 @@ def db_shell(ctx, module, dbname, module_config_key):
     default=False,
     is_flag=True,
 )
+@click.option(
+    "-q",
+    "--quiet",
+    help=(
+        "Only print the module, version and flavor of each database, "
+        "tab separated, one database per line"
+    ),
+    default=False,
+    is_flag=True,
+)
 @click.pass_context
 def db_version(
-    ctx, module, show_history, all_backends, module_config_key, module_is_path
+    ctx, module, show_history, all_backends, module_config_key, module_is_path, quiet
 ):
     """Print the database version for the Software Heritage.
 
@@ -505,21 +536,30 @@ def db_version(
         swh db version scrubber:scrubber_db
         swh db version --all scrubber
 
+    With --quiet, the datastore backend is not instantiated, so the current
+    code version is not reported, nor is the version history.
     """
-    from swh.core.db.db_utils import (
-        get_database_info,
-        import_swhmodule,
-        swh_db_versions,
-    )
+    from swh.core.db.db_utils import get_database_info
 
     backends = handle_cmd_args(
-        cfg=ctx.obj["config"],
+        cfg=_get_config(ctx),
         module=module,
         do_all=all_backends,
         config_key=module_config_key,
         is_path=module_is_path,
     )
 
+    if quiet:
+        lines = []
+        for package, _, backend_class, cnxstr, cfg in backends:
+            db_module, db_version, db_flavor = get_database_info(cnxstr)
+            if db_module is None:
+                db_module = f"{package}:{cfg['cls']}"
+            lines.append(f"{db_module}\t{db_version}\t{db_flavor or '-'}")
+        if lines:
+            click.echo("\n".join(lines))
+        return
+
     for package, _, backend_class, cnxstr, cfg in backends:
         db_module, db_version, db_flavor = get_database_info(cnxstr)
         if db_module is None:
@@ -543,12 +583,7 @@ def db_version(
             click.secho(f"flavor: {db_flavor}", fg="green", bold=True)
 
         # instantiate the data source to retrieve the current (expected) db version
-        datastore_factory = getattr(import_swhmodule(db_module), "get_datastore", None)
-        if not datastore_factory and backend_class is not None:
-
-            def datastore_factory(cls, **cfg):
-                return backend_class(**cfg)
-
+        datastore_factory = get_datastore_factory(db_module, backend_class)
         if datastore_factory:
             datastore = datastore_factory(**cfg)
             code_version = datastore.current_version
@@ -561,6 +596,8 @@ def db_version(
         if not show_history:
             click.secho(f"version: {db_version}", fg="green", bold=True)
         else:
+            from swh.core.db.db_utils import swh_db_versions
+
             versions = swh_db_versions(cnxstr)
             for version, tstamp, desc in versions:
                 click.echo(f"{version} [{tstamp}] {desc}")
@@ -607,6 +644,14 @@ def db_version(
     default=False,
     is_flag=True,
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of databases to process concurrently (mostly useful with --all)",
+)
 @click.pass_context
 def db_upgrade(
     ctx,
@@ -617,6 +662,7 @@ def db_upgrade(
     module_config_key,
     upgrade_all,
     module_is_path,
+    jobs,
 ):
     """Upgrade the database for given module (to a given version if specified).
 
@@ -627,19 +673,15 @@ def db_upgrade(
         swh db upgrade scheduler --to-version=10
         swh db upgrade scrubber:scrubber_db --to-version=10
 
-    """
-    from swh.core.db.db_utils import (
-        get_database_info,
-        import_swhmodule,
-        swh_db_upgrade,
-        swh_set_db_module,
-    )
+    Note that databases are upgraded one at a time in interactive mode,
+    whatever the --jobs value.
 
+    """
     # TODO: mark --module-config-key as deprecated
     # TODO: check options consistency
 
     backends = handle_cmd_args(
-        cfg=ctx.obj["config"],
+        cfg=_get_config(ctx) if dbname is None or upgrade_all else {},
         module=module,
         do_all=upgrade_all,
         dbname=dbname,
@@ -647,89 +689,164 @@ def db_upgrade(
         is_path=module_is_path,
     )
 
-    for package, fullmodule, backend_class, dbname, cfg in backends:
-        logger.debug("db_version dbname=%s", dbname)
-        go_to_version = to_version
+    _run_all(
+        ctx,
+        functools.partial(
+            upgrade_one, module=module, to_version=to_version, interactive=interactive
+        ),
+        backends,
+        jobs=1 if interactive else jobs,
+    )
+
+
+def upgrade_one(
+    package, fullmodule, backend_class, dbname, cfg, module, to_version, interactive
+):
+    from swh.core.db.db_utils import get_database_info
+
+    logger.debug("db_version dbname=%s", dbname)
+    db_module, db_version, db_flavor = get_database_info(dbname)
+    backend = f"{package}:{cfg['cls']}"
+    if db_module is None:
+        click.secho(
+            "Warning: the database does not have a dbmodule table.",
+            fg="yellow",
+            bold=True,
+        )
+        if interactive and not click.confirm(
+            f"Write the module information ({backend}) in the database?",
+            default=True,
+        ):
+            raise click.BadParameter("Migration aborted.")
+    if db_module is None or (db_module != backend and ":" not in db_module):
+        # module stored in the db needs updating
+        from swh.core.db.db_utils import swh_set_db_module
+
+        swh_set_db_module(dbname, backend)
+        click.secho(
+            "The module registered in the database has been updated "
+            f"from '{db_module}' to '{backend}'",
+            fg="red",
+            bold=True,
+        )
         db_module, db_version, db_flavor = get_database_info(dbname)
-        backend = f"{package}:{cfg['cls']}"
-        if db_module is None:
+
+    if db_module != backend:
+        raise click.BadParameter(
+            f"Error: the given module ({module}) does not match the value "
+            f"stored in the database ({db_module})."
+        )
+
+    # instantiate the data source to retrieve the current (expected) db version
+    datastore_factory = get_datastore_factory(fullmodule, backend_class)
+    if not datastore_factory:
+        raise click.UsageError(
+            f"You cannot use this command on old-style datastore backend {db_module}"
+        )
+    datastore = datastore_factory(**cfg)
+    ds_version = datastore.current_version
+    if to_version is None:
+        to_version = ds_version
+    if to_version > ds_version:
+        raise click.UsageError(
+            f"The target version {to_version} is larger than the current version "
+            f"{ds_version} of the datastore backend {db_module}"
+        )
+
+    if to_version == db_version:
+        click.secho(
+            f"No migration needed for '{backend}': the current version is {db_version}",
+            fg="yellow",
+        )
+    else:
+        from swh.core.db.db_utils import swh_db_upgrade
+
+        new_db_version = swh_db_upgrade(dbname, backend, to_version)
+        click.secho(f"Migration to version {new_db_version} done", fg="green")
+        if new_db_version < ds_version:
             click.secho(
-                "Warning: the database does not have a dbmodule table.",
+                "Warning: migration was not complete: "
+                f"the current version is {ds_version}",
                 fg="yellow",
-                bold=True,
-            )
-            if interactive and not click.confirm(
-                f"Write the module information ({backend}) in the database?",
-                default=True,
-            ):
-                raise click.BadParameter("Migration aborted.")
-        if db_module is None or (db_module != backend and ":" not in db_module):
-            # module stored in the db needs updating
-            swh_set_db_module(dbname, backend)
-            click.secho(
-                "The module registered in the database has been updated "
-                f"from '{db_module}' to '{backend}'",
-                fg="red",
-                bold=True,
             )
-            db_module, db_version, db_flavor = get_database_info(dbname)
 
-        if db_module != backend:
-            raise click.BadParameter(
-                f"Error: the given module ({module}) does not match the value "
-                f"stored in the database ({db_module})."
-            )
 
-        # instantiate the data source to retrieve the current (expected) db version
-        datastore_factory = getattr(import_swhmodule(fullmodule), "get_datastore", None)
+def _run_all(ctx, func, args, jobs=1) -> None:
+    """Call `func` with each tuple of `args` as positional arguments
 
-        if datastore_factory is None and backend_class is not None:
+    If `jobs` is more than 1, up to `jobs` calls are run concurrently in a
+    thread pool (within the given click context). Exceptions are raised in the
+    order of `args`, once the pending calls are done.
+    """
+    if jobs <= 1:
+        for arg in args:
+            func(*arg)
+        return
 
-            def datastore_factory(cls, **cfg):
-                return backend_class(**cfg)
+    from concurrent.futures import ThreadPoolExecutor
 
-        if not datastore_factory:
-            raise click.UsageError(
-                "You cannot use this command on old-style datastore backend {db_module}"
-            )
-        datastore = datastore_factory(**cfg)
-        ds_version = datastore.current_version
-        if go_to_version is None:
-            go_to_version = ds_version
-        if go_to_version > ds_version:
-            raise click.UsageError(
-                f"The target version {go_to_version} is larger than the current version "
-                f"{ds_version} of the datastore backend {db_module}"
-            )
+    def run(arg):
+        with ctx.scope(cleanup=False):
+            return func(*arg)
 
-        if go_to_version == db_version:
-            click.secho(
-                f"No migration needed for '{backend}': the current version is {db_version}",
-                fg="yellow",
-            )
-        else:
-            new_db_version = swh_db_upgrade(dbname, backend, go_to_version)
-            click.secho(f"Migration to version {new_db_version} done", fg="green")
-            if new_db_version < ds_version:
-                click.secho(
-                    "Warning: migration was not complete: "
-                    f"the current version is {ds_version}",
-                    fg="yellow",
-                )
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(run, arg) for arg in args]
+        for future in futures:
+            future.result()
+
+
+def get_datastore_factory(
+    module: str, backend_class: Optional[type] = None
+) -> Optional[Callable[..., Any]]:
+    """Return the datastore factory for the given module
+
+    This is the ``get_datastore`` function of the module if any, or a factory
+    instantiating `backend_class` otherwise (if given).
+
+    Within a cli command, the module lookup is done only once per module, the
+    result being memoized in the click context object. The module is not
+    imported again if it is the one `backend_class` has been loaded from.
+    """
+    ctx = click.get_current_context(silent=True)
+    if ctx is not None and isinstance(ctx.obj, dict):
+        factories = ctx.obj.setdefault("datastore_factories", {})
+    else:
+        factories = {}
+    if module not in factories:
+        swhmodule = None
+        if backend_class is not None and backend_class.__module__ == module:
+            # the module has already been imported to load the backend class
+            swhmodule = sys.modules.get(module)
+        if swhmodule is None:
+            from swh.core.db.db_utils import import_swhmodule
+
+            swhmodule = import_swhmodule(module)
+        factories[module] = getattr(swhmodule, "get_datastore", None)
+    datastore_factory = factories[module]
+
+    if datastore_factory is None and backend_class is not None:
+
+        def datastore_factory(cls, **cfg):
+            return backend_class(**cfg)
+
+    return datastore_factory
 
 
 def get_dburl_from_config(cfg):
-    if cfg["cls"] == "pipeline":
+    cls = cfg.get("cls")
+    if cls == "pipeline":
         # We know the database itself will always
         # come last in a pipeline configuration.
         cfg = cfg["steps"][-1]
-    if cfg.get("cls") != "postgresql":
+        cls = cfg.get("cls")
+    if cls != "postgresql":
         raise click.BadParameter(
             "Configuration cls must be set to 'postgresql' for this command."
         )
-    if "args" in cfg:
+    args = cfg.get("args")
+    if args is not None:
         # for bw compat
-        cfg = cfg["args"]
+        cfg = args
     return cfg.get("db"), cfg
 
 
@@ -754,10 +871,11 @@ def get_dburl_from_config_key(cfg, path):
     cfg = cfg[swhmod]
 
     for key_e in cfgpath:
-        if isinstance(cfg, list):
-            cfg = cfg[int(key_e)]
-        else:
+        try:
             cfg = cfg[key_e]
+        except TypeError:
+            # list indices must be integers
+            cfg = cfg[int(key_e)]
 
     assert isinstance(cfg, dict)
     if "db" in cfg:
@@ -783,10 +901,10 @@ def handle_cmd_args(
     do_all: bool = False,
     dbname: Optional[str] = None,
     config_key: Optional[str] = None,
-) -> List[Tuple[str, str, Optional[type], str, Dict[str, Any]]]:
-    """Helper function to build the list of backends to handle in a cli command
+) -> Iterator[Tuple[str, str, Optional[type], str, Dict[str, Any]]]:
+    """Helper function to generate the backends to handle in a cli command
 
-    For each identified backend, returns a tuple:
+    For each identified backend, yields a tuple:
       (package, module, backend_class, cnxstr, cfg)
     where:
       - `package`: the (swh) package this backend is implemented in (e.g.
@@ -804,7 +922,7 @@ def handle_cmd_args(
     `cfg["cls"]` name. However, there is bw compatibility for swh packages not
     yet updated to register these backends in the entry points.
 
-    If `dbname` is given, return only one element in the list, with a config made
+    If `dbname` is given, yield only one element, with a config made
     of {'cls': 'postgresql', 'db': dbname}.
 
     If `do_all` is True, look for every backend in the configuration (cfg) under
@@ -834,24 +952,29 @@ def handle_cmd_args(
             raise ValueError("Cannot use both 'all' and a specific config target")
         if dbname:
             raise ValueError("Cannot use both 'dbname' and a specific config target")
+    if do_all and ":" in module:
+        raise click.BadParameter(
+            f"'{module}' is a backend reference, not a swh module; "
+            "it cannot be used with the --all option."
+        )
 
     package = module
-    backends = []
 
     if do_all:
-        for cfgmod, path, dbcfg, cnxstr in list_db_config_entries(cfg):
-            if cfgmod == module:
-                fullmodule, backend_class = get_swh_backend_module(
-                    swh_package=cfgmod, cls=dbcfg["cls"]
-                )
-                backends.append((cfgmod, fullmodule, backend_class, cnxstr, dbcfg))
+        for cfgmod, path, dbcfg, cnxstr in list_db_config_entries(
+            cfg, only_module=module
+        ):
+            fullmodule, backend_class = get_swh_backend_module(
+                swh_package=cfgmod, cls=dbcfg["cls"]
+            )
+            yield (cfgmod, fullmodule, backend_class, cnxstr, dbcfg)
     else:
         if dbname is not None:
             # default behavior
-            if ":" in module:
-                module, cls = module.split(":", 1)
+            package, sep, cls = module.partition(":")
+            if sep:
+                module = package
             else:
-                assert module is not None
                 backend_package, backend_cls = get_swh_backend_from_fullmodule(module)
                 if backend_package is None:
                     cls = "postgresql"
@@ -886,5 +1009,4 @@ def handle_cmd_args(
                 "configuration file or use the --dbname option."
             )
 
-        backends.append((package, fullmodule, backend_class, dbname, dbcfg))
-    return backends
+        yield (package, fullmodule, backend_class, dbname, dbcfg)
@@ -10,9 +10,7 @@ import logging
 import os
 from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
 
-from backports.entry_points_selectable import entry_points as get_entry_points
 from deprecated import deprecated
-import yaml
 
 logger = logging.getLogger(__name__)
 
@@ -33,21 +31,65 @@ SWH_CONFIG_EXTENSIONS = [
     ".yml",
 ]
 
+
+def _identity(x):
+    return x
+
+
+def _always_true(x):
+    return True
+
+
+def _to_bool(x):
+    return x.lower() == "true"
+
+
+def _to_list_str(x):
+    return [value.strip() for value in x.split(",")]
+
+
+def _to_list_int(x):
+    return [int(value.strip()) for value in x.split(",")]
+
+
+def _is_int(x):
+    return isinstance(x, int)
+
+
+def _is_bool(x):
+    return isinstance(x, bool)
+
+
+def _is_list_str(x):
+    return isinstance(x, list) and all(isinstance(y, str) for y in x)
+
+
+def _is_list_int(x):
+    return isinstance(x, list) and all(isinstance(y, int) for y in x)
+
+
 # conversion per type
 _map_convert_fn: Dict[str, Callable] = {
     "int": int,
-    "bool": lambda x: x.lower() == "true",
-    "list[str]": lambda x: [value.strip() for value in x.split(",")],
-    "list[int]": lambda x: [int(value.strip()) for value in x.split(",")],
+    "bool": _to_bool,
+    "list[str]": _to_list_str,
+    "list[int]": _to_list_int,
 }
 
 _map_check_fn: Dict[str, Callable] = {
-    "int": lambda x: isinstance(x, int),
-    "bool": lambda x: isinstance(x, bool),
-    "list[str]": lambda x: (isinstance(x, list) and all(isinstance(y, str) for y in x)),
-    "list[int]": lambda x: (isinstance(x, list) and all(isinstance(y, int) for y in x)),
+    "int": _is_int,
+    "bool": _is_bool,
+    "list[str]": _is_list_str,
+    "list[int]": _is_list_int,
 }
 
+# (check, conversion) functions per type
+_TYPE_TABLE: Dict[str, Tuple[Callable, Callable]] = {
+    nature_type: (_map_check_fn[nature_type], _map_convert_fn[nature_type])
+    for nature_type in _map_check_fn
+}
+_DEFAULT_TYPE_FNS: Tuple[Callable, Callable] = (_always_true, _identity)
+
 
 def exists_accessible(filepath: str) -> bool:
     """Check whether a file exists, and is accessible.
@@ -62,15 +104,11 @@ def exists_accessible(filepath: str) -> bool:
 
     try:
         os.stat(filepath)
-    except PermissionError:
-        raise
     except (FileNotFoundError, NotADirectoryError):
         return False
-    else:
-        if os.access(filepath, os.R_OK):
-            return True
-        else:
-            raise PermissionError("Permission denied: {filepath!r}")
+    if not os.access(filepath, os.R_OK):
+        raise PermissionError(f"Permission denied: {filepath!r}")
+    return True
 
 
 def read_raw_config(base_config_path: str) -> Dict[str, Any]:
@@ -78,14 +116,88 @@ def read_raw_config(base_config_path: str) -> Dict[str, Any]:
 
     Can read yml files.
     """
-    yml_file = config_path(base_config_path)
+    yml_file, conf = _load_config_file(base_config_path)
     if yml_file is None:
         logging.error("Config file %s does not exist, ignoring it.", base_config_path)
         return {}
-    else:
-        logger.debug("Loading config file %s", yml_file)
-        with open(yml_file) as f:
-            return yaml.safe_load(f)
+    return conf
+
+
+def _load_config_file(base_config_path: str) -> Tuple[Optional[str], Any]:
+    """Load the yaml config file base_config_path, or base_config_path with one of
+    :data:`SWH_CONFIG_EXTENSIONS` appended if the former does not exist.
+
+    Returns:
+        the path of the loaded file (None if no file exists) and a copy of its
+        parsed content
+
+    Raises:
+        PermissionError if the file cannot be read.
+    """
+    candidates = chain(
+        [base_config_path], (base_config_path + ext for ext in SWH_CONFIG_EXTENSIONS)
+    )
+    for yml_file in candidates:
+        try:
+            conf = _load_yaml(os.path.abspath(yml_file))
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            continue
+        if yml_file != base_config_path:
+            logger.warning(
+                "%s does not exist, using %s instead", base_config_path, yml_file
+            )
+        logger.debug("Loaded config file %s", yml_file)
+        return yml_file, _copy_config(conf)
+
+    return None, None
+
+
+def _copy_config(value: Any) -> Any:
+    """Copy a parsed yaml document, so it can be modified without altering the
+    cached one.
+
+    Only the containers yaml can create (dicts, lists and sets) are copied,
+    which is much cheaper than :func:`copy.deepcopy`.
+    """
+    if isinstance(value, dict):
+        return {k: _copy_config(v) for k, v in value.items()}
+    elif isinstance(value, list):
+        return [_copy_config(v) for v in value]
+    elif isinstance(value, set):
+        return set(value)
+    return value
+
+
+def _yaml_safe_load(stream) -> Any:
+    # yaml is imported lazily, as it is only needed to actually read config files
+    import yaml
+
+    # use the libyaml based loader when PyYAML has been built with it
+    return yaml.load(stream, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+# parsed yaml config files, per absolute path: (file signature, parsed content)
+_RAW_CACHE: Dict[str, Tuple[Tuple[int, int, int, int], Any]] = {}
+
+
+def _load_yaml(path: str) -> Any:
+    """Parse the yaml file at path, unless it has already been parsed and has not
+    been modified since.
+
+    Files are considered unmodified if their inode, size, modification and
+    status change times are the same; the latter cannot be set back by user
+    tools, so a file replaced by one of the same size and modification time
+    (e.g. by ``cp -p`` or ``rsync -t``) is parsed again.
+    """
+    st = os.stat(path)
+    signature = (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+    cached = _RAW_CACHE.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with open(path) as f:
+        content = _yaml_safe_load(f)
+    _RAW_CACHE[path] = (signature, content)
+    return content
 
 
 @deprecated(
@@ -94,8 +206,7 @@ def read_raw_config(base_config_path: str) -> Dict[str, Any]:
 )
 def config_exists(path):
     """Check whether the given config exists"""
-    path = config_path(path)
-    return path is not None and exists_accessible(path)
+    return config_path(path) is not None
 
 
 @deprecated(version="2.23.0", reason="pass config paths as-is to read_raw_config/read")
@@ -142,24 +253,39 @@ def read(
     If conf_file is None, return the default config.
 
     """
-    conf: Dict[str, Any] = {}
+    if not conf_file:
+        # nothing to check nor convert, the default values are the config
+        if not default_conf:
+            return {}
+        return {key: value for key, (_, value) in default_conf.items()}
+
+    base_config_path = os.path.expanduser(conf_file)
+    conf = read_raw_config(base_config_path) or {}
 
-    if conf_file:
-        base_config_path = os.path.expanduser(conf_file)
-        conf = read_raw_config(base_config_path) or {}
+    return _fill_defaults(conf, default_conf)
 
+
+def _fill_defaults(
+    conf: Dict[str, Any], default_conf: Optional[Dict[str, Tuple[str, Any]]]
+) -> Dict[str, Any]:
+    """Fill in the gaps of conf, in place, using default_conf (see :func:`read`)"""
     if not default_conf:
         return conf
 
+    type_table = _TYPE_TABLE
+    default_type_fns = _DEFAULT_TYPE_FNS
+
     # remaining missing default configuration key are set
     # also type conversion is enforced for underneath layer
     for key, (nature_type, default_value) in default_conf.items():
         val = conf.get(key, None)
         if val is None:  # fallback to default value
             conf[key] = default_value
-        elif not _map_check_fn.get(nature_type, lambda x: True)(val):
+            continue
+        check, convert = type_table.get(nature_type, default_type_fns)
+        if not check(val):
             # value present but not in the proper format, force type conversion
-            conf[key] = _map_convert_fn.get(nature_type, lambda x: x)(val)
+            conf[key] = convert(val)
 
     return conf
 
@@ -175,9 +301,9 @@ def priority_read(
 
     # Try all the files in order
     for filename in conf_filenames:
-        full_filename = config_path(os.path.expanduser(filename))
+        full_filename, conf = _load_config_file(os.path.expanduser(filename))
         if full_filename is not None:
-            return read(full_filename, default_conf)
+            return _fill_defaults(conf or {}, default_conf)
 
     # Else, return the default configuration
     return read(None, default_conf)
@@ -185,12 +311,13 @@ def priority_read(
 
 def merge_default_configs(base_config, *other_configs):
     """Merge several default config dictionaries, from left to right"""
-    full_config = base_config.copy()
+    return dict(
+        chain(base_config.items(), *(config.items() for config in other_configs))
+    )
 
-    for config in other_configs:
-        full_config.update(config)
 
-    return full_config
+# config values that can be shared between merged configs rather than copied
+_IMMUTABLE_TYPES = (str, bytes, int, float, bool, type(None))
 
 
 def merge_configs(base: Optional[Dict[str, Any]], other: Optional[Dict[str, Any]]):
@@ -247,10 +374,7 @@ def merge_configs(base: Optional[Dict[str, Any]], other: Optional[Dict[str, Any]
         raise TypeError("Cannot merge a %s with a %s" % (type(base), type(other)))
 
     output = {}
-    for k in chain(base.keys(), other.keys()):
-        if k in output:
-            continue
-
+    for k in dict.fromkeys(chain(base, other)):
         vb = base.get(k)
         vo = other.get(k)
 
@@ -259,9 +383,9 @@ def merge_configs(base: Optional[Dict[str, Any]], other: Optional[Dict[str, Any]
         elif isinstance(vb, dict) and k in other and other[k] is not None:
             output[k] = merge_configs(vb, vo is not None and vo or {})
         elif k in other:
-            output[k] = deepcopy(vo)
+            output[k] = vo if isinstance(vo, _IMMUTABLE_TYPES) else deepcopy(vo)
         else:
-            output[k] = deepcopy(vb)
+            output[k] = vb if isinstance(vb, _IMMUTABLE_TYPES) else deepcopy(vb)
 
     return output
 
@@ -270,18 +394,18 @@ def swh_config_paths(base_filename: str) -> List[str]:
     """Return the Software Heritage specific configuration paths for the given
     filename."""
 
-    return [os.path.join(dirname, base_filename) for dirname in SWH_CONFIG_DIRECTORIES]
+    return list(_swh_config_paths(tuple(SWH_CONFIG_DIRECTORIES), base_filename))
 
 
-def prepare_folders(conf, *keys):
-    """Prepare the folder mentioned in config under keys."""
+@lru_cache(maxsize=256)
+def _swh_config_paths(dirnames: Tuple[str, ...], base_filename: str) -> Tuple[str, ...]:
+    return tuple(os.path.join(dirname, base_filename) for dirname in dirnames)
 
-    def makedir(folder):
-        if not os.path.exists(folder):
-            os.makedirs(folder)
 
+def prepare_folders(conf, *keys):
+    """Prepare the folder mentioned in config under keys."""
     for key in keys:
-        makedir(conf[key])
+        os.makedirs(conf[key], exist_ok=True)
 
 
 def load_global_config():
@@ -333,9 +457,22 @@ def load_from_envvar(default_config: Optional[Dict[str, Any]] = None) -> Dict[st
     return cfg
 
 
-@lru_cache()
+def get_entry_points(group: str):
+    # imported lazily, as scanning entry points is only needed to look up backends
+    from backports.entry_points_selectable import entry_points
+
+    return entry_points(group=group)
+
+
+@lru_cache(maxsize=None)
+def _entry_points_for(package: str):
+    """Return the entry points of the backend classes of the given swh package"""
+    return get_entry_points(group=f"swh.{package}.classes")
+
+
+@lru_cache(maxsize=None)
 def get_swh_backend_module(swh_package: str, cls: str) -> Tuple[str, Optional[type]]:
-    entry_points = get_entry_points(group=f"swh.{swh_package}.classes")
+    entry_points = _entry_points_for(swh_package)
     if not entry_points:
         # it's an "old-style" swh package, not declaring its classes entry point
         logger.warning(
@@ -360,7 +497,7 @@ def get_swh_backend_module(swh_package: str, cls: str) -> Tuple[str, Optional[ty
     return entry_point.module, BackendCls
 
 
-@lru_cache()
+@lru_cache(maxsize=None)
 def get_swh_backend_from_fullmodule(
     fullmodule: str,
 ) -> Tuple[Optional[str], Optional[str]]:
@@ -368,7 +505,7 @@ def get_swh_backend_from_fullmodule(
         fullmodule = f"swh.{fullmodule}"
     package = fullmodule.split(".")[1]
 
-    entry_points = get_entry_points(group=f"swh.{package}.classes")
+    entry_points = _entry_points_for(package)
     for entry_point in entry_points:
         if entry_point.module == fullmodule:
             return package, entry_point.name
@@ -379,13 +516,18 @@ def get_swh_backend_from_fullmodule(
 def list_swh_backends(package: str) -> List[str]:
     if package.startswith("swh."):
         package = package[4:]
-    entry_points = get_entry_points(group=f"swh.{package}.classes")
+    entry_points = _entry_points_for(package)
     return [ep.name for ep in entry_points]
 
 
-def list_db_config_entries(cfg) -> Generator[Tuple[str, str, dict, str], None, None]:
+def list_db_config_entries(
+    cfg, only_module: Optional[str] = None
+) -> Generator[Tuple[str, str, dict, str], None, None]:
     """List all the db config entries in the given config structure
 
+    If `only_module` is given, only the config entries of this swh module are
+    listed, and the other sections of the config structure are not walked.
+
     Generates quadruplets (module, path, cfg, cnxstr) where:
 
     - the swh module name (aka top level config entries, eg. 'storage',
@@ -412,6 +554,13 @@ def list_db_config_entries(cfg) -> Generator[Tuple[str, str, dict, str], None, N
                 elif isinstance(value, dict):
                     yield from look(value, path=f"{path}.{key}")
 
-    for rootmodule, subcfg in cfg.items():
+    if only_module is not None:
+        roots = [(only_module, cfg[only_module])] if only_module in cfg else []
+    else:
+        roots = cfg.items()
+
+    for rootmodule, subcfg in roots:
+        if not isinstance(subcfg, dict):
+            continue
         for path, cfg_entry, cnxstr in look(subcfg, rootmodule):
             yield rootmodule, path, cfg_entry, cnxstr
@@ -8,10 +8,17 @@ import datetime
 import enum
 import json
 import logging
-import os
-import sys
-import threading
-from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Type, TypeVar
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    Type,
+    TypeVar,
+)
 
 import psycopg2
 import psycopg2.extras
@@ -31,7 +38,10 @@ def render_array(data) -> str:
     # plus decoration that indicates the array structure. The decoration consists of
     # curly braces ({ and }) around the array value plus delimiter characters between
     # adjacent items. The delimiter character is usually a comma (,)"
-    return "{%s}" % ",".join(render_array_element(e) for e in data)
+    if all(type(e) is int for e in data):
+        # integers need neither quoting nor escaping
+        return "{%s}" % ",".join(map(str, data))
+    return "{%s}" % ",".join([render_array_element(e) for e in data])
 
 
 def render_array_element(element) -> str:
@@ -65,25 +75,55 @@ def value_as_pg_text(data: Any) -> str:
     if data is None:
         raise ValueError("value_as_pg_text doesn't handle NULLs")
 
-    if isinstance(data, bytes):
-        return "\\x%s" % data.hex()
-    elif isinstance(data, datetime.datetime):
-        return data.isoformat()
-    elif isinstance(data, dict):
-        return json.dumps(data)
-    elif isinstance(data, (list, tuple)):
-        return render_array(data)
-    elif isinstance(data, psycopg2.extras.Range):
-        return "%s%s,%s%s" % (
-            "[" if data.lower_inc else "(",
-            "-infinity" if data.lower_inf else value_as_pg_text(data.lower),
-            "infinity" if data.upper_inf else value_as_pg_text(data.upper),
-            "]" if data.upper_inc else ")",
-        )
-    elif isinstance(data, enum.IntEnum):
-        return str(int(data))
+    formatter = _pg_text_formatters.get(type(data))
+    if formatter is None:
+        formatter = _pg_text_formatters[type(data)] = _pg_text_formatter(type(data))
+    return formatter(data)
+
+
+def _bytes_as_pg_text(data: bytes) -> str:
+    return "\\x%s" % data.hex()
+
+
+def _range_as_pg_text(data: psycopg2.extras.Range) -> str:
+    return "%s%s,%s%s" % (
+        "[" if data.lower_inc else "(",
+        "-infinity" if data.lower_inf else value_as_pg_text(data.lower),
+        "infinity" if data.upper_inf else value_as_pg_text(data.upper),
+        "]" if data.upper_inc else ")",
+    )
+
+
+def _pg_text_formatter(data_type: type) -> Callable[[Any], str]:
+    """Return the function rendering values of the given type in the postgresql text
+    format"""
+    if issubclass(data_type, bytes):
+        return _bytes_as_pg_text
+    elif issubclass(data_type, datetime.datetime):
+        return data_type.isoformat
+    elif issubclass(data_type, dict):
+        return json.dumps
+    elif issubclass(data_type, (list, tuple)):
+        return render_array
+    elif issubclass(data_type, psycopg2.extras.Range):
+        return _range_as_pg_text
+    elif issubclass(data_type, enum.IntEnum):
+        # render all the members once; values that are not members (e.g. created
+        # by _missing_) are rendered on the fly
+        rendered = {
+            member: str(int(member)) for member in data_type.__members__.values()
+        }
+        return lambda data: rendered.get(data) or str(int(data))
     else:
-        return str(data)
+        return str
+
+
+# value_as_pg_text formatters, per exact type of the values; other types are added
+# the first time a value of that type is rendered
+_pg_text_formatters: Dict[type, Callable[[Any], str]] = {
+    data_type: _pg_text_formatter(data_type)
+    for data_type in (str, int, float, bytes, datetime.datetime, dict, list, tuple)
+}
 
 
 def escape_copy_column(column: str) -> str:
@@ -111,6 +151,44 @@ def typecast_bytea(value, cur):
         return data.tobytes()
 
 
+BYTEA_TYPE = psycopg2.extensions.new_type((17,), "bytea", typecast_bytea)
+BYTEA_ARRAY_TYPE = psycopg2.extensions.new_array_type((1001,), "bytea[]", BYTEA_TYPE)
+
+COPY_BUFFER_SIZE = 64 * 1024
+"""Size of the chunks of data sent to the server by :meth:`BaseDb.copy_to`"""
+
+
+class _CopyFile:
+    """Minimal file-like object feeding the given lines (without their line
+    terminator) to ``COPY ... FROM STDIN`` (see
+    :meth:`psycopg2.extensions.cursor.copy_expert`).
+
+    Any exception raised while generating the lines is kept in the ``exception``
+    attribute.
+    """
+
+    def __init__(self, lines: Iterator[str]):
+        self.lines = lines
+        self.exception: Optional[Exception] = None
+
+    def read(self, size: int = -1) -> str:
+        chunk = []
+        length = 0
+        try:
+            for line in self.lines:
+                chunk.append(line)
+                length += len(line) + 1
+                if 0 <= size <= length:
+                    break
+        except Exception as e:
+            self.exception = e
+            raise
+        if not chunk:
+            return ""
+        chunk.append("")
+        return "\n".join(chunk)
+
+
 BaseDbType = TypeVar("BaseDbType", bound="BaseDb")
 
 
@@ -125,11 +203,8 @@ class BaseDb:
     def adapt_conn(conn: psycopg2.extensions.connection):
         """Makes psycopg2 use 'bytes' to decode bytea instead of
         'memoryview', for this connection."""
-        t_bytes = psycopg2.extensions.new_type((17,), "bytea", typecast_bytea)
-        psycopg2.extensions.register_type(t_bytes, conn)
-
-        t_bytes_array = psycopg2.extensions.new_array_type((1001,), "bytea[]", t_bytes)
-        psycopg2.extensions.register_type(t_bytes_array, conn)
+        psycopg2.extensions.register_type(BYTEA_TYPE, conn)
+        psycopg2.extensions.register_type(BYTEA_ARRAY_TYPE, conn)
 
     @classmethod
     def connect(cls: Type[BaseDbType], *args, **kwargs) -> BaseDbType:
@@ -172,6 +247,13 @@ class BaseDb:
         if self.pool:
             self.pool.putconn(self.conn)
 
+    def __enter__(self: BaseDbType) -> BaseDbType:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Give the connection back to its pool, if any"""
+        self.put_conn()
+
     def cursor(
         self, cur_arg: Optional[psycopg2.extensions.cursor] = None
     ) -> psycopg2.extensions.cursor:
@@ -232,66 +314,57 @@ class BaseDb:
         if default_values is None:
             default_values = {}
 
-        read_file, write_file = os.pipe()
-        exc_info = None
-
-        def writer():
-            nonlocal exc_info
-            cursor = self.cursor(cur)
-            with open(read_file, "r") as f:
-                try:
-                    cursor.copy_expert(
-                        "COPY %s (%s) FROM STDIN" % (tblname, ", ".join(columns)), f
-                    )
-                except Exception:
-                    # Tell the main thread about the exception
-                    exc_info = sys.exc_info()
-
-        write_thread = threading.Thread(target=writer)
-        write_thread.start()
-
+        columns = list(columns)
+        column_defaults = [(k, default_values.get(k)) for k in columns]
+
+        def lines() -> Iterator[str]:
+            # From https://www.postgresql.org/docs/11/sql-copy.html
+            # File Formats > Text Format
+            # "When the text format is used, the data read or written is a text file
+            # with one line per table row. Columns in a row are separated by the
+            # delimiter character."
+            # NULL
+            # "The default is \N (backslash-N) in text format."
+            # DELIMITER
+            # "The default is a tab character in text format."
+            for d in items:
+                if item_cb is not None:
+                    item_cb(d)
+                line = []
+                for k, default_value in column_defaults:
+                    value = d.get(k, default_value)
+                    try:
+                        if value is None:
+                            line.append("\\N")
+                        elif type(value) is bytes:
+                            # the bytea hex format, with its backslash escaped
+                            line.append("\\\\x" + value.hex())
+                        else:
+                            line.append(escape_copy_column(value_as_pg_text(value)))
+                    except Exception as e:
+                        logger.error(
+                            "Could not escape value `%r` for column `%s`:"
+                            "Received exception: `%s`",
+                            value,
+                            k,
+                            e,
+                        )
+                        raise e from None
+                yield "\t".join(line)
+
+        copy_file = _CopyFile(lines())
         try:
-            with open(write_file, "w") as f:
-                # From https://www.postgresql.org/docs/11/sql-copy.html
-                # File Formats > Text Format
-                # "When the text format is used, the data read or written is a text file
-                # with one line per table row. Columns in a row are separated by the
-                # delimiter character."
-                # NULL
-                # "The default is \N (backslash-N) in text format."
-                # DELIMITER
-                # "The default is a tab character in text format."
-                for d in items:
-                    if item_cb is not None:
-                        item_cb(d)
-                    line = []
-                    for k in columns:
-                        value = d.get(k, default_values.get(k))
-                        try:
-                            if value is None:
-                                line.append("\\N")
-                            else:
-                                line.append(escape_copy_column(value_as_pg_text(value)))
-                        except Exception as e:
-                            logger.error(
-                                "Could not escape value `%r` for column `%s`:"
-                                "Received exception: `%s`",
-                                value,
-                                k,
-                                e,
-                            )
-                            raise e from None
-                    f.write("\t".join(line))
-                    f.write("\n")
-
-        finally:
-            # No problem bubbling up exceptions, but we still need to make sure
-            # we finish copying, even though we're probably going to cancel the
-            # transaction.
-            write_thread.join()
-            if exc_info:
-                # postgresql returned an error, let's raise it.
-                raise exc_info[1].with_traceback(exc_info[2])
+            self.cursor(cur).copy_expert(
+                "COPY %s (%s) FROM STDIN" % (tblname, ", ".join(columns)),
+                copy_file,
+                size=COPY_BUFFER_SIZE,
+            )
+        except Exception:
+            if copy_file.exception is not None:
+                # psycopg2 aborts the COPY when reading the data fails, and
+                # reports it as a QueryCanceled error; raise the actual error.
+                raise copy_file.exception from None
+            raise
 
     def mktemp(self, tblname: str, cur: Optional[psycopg2.extensions.cursor] = None):
         self.cursor(cur).execute("SELECT swh_mktemp(%s)", (tblname,))
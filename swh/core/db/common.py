@@ -19,17 +19,68 @@ def remove_kwargs(names):
     return decorator
 
 
+# settings the server reports to the client whenever they change, so their
+# current value is known by libpq without a query (keyed by lowercase name,
+# as libpq looks them up case-sensitively)
+_REPORTED_SETTINGS = {
+    name.lower(): name
+    for name in (
+        "application_name",
+        "client_encoding",
+        "DateStyle",
+        "default_transaction_read_only",
+        "in_hot_standby",
+        "integer_datetimes",
+        "IntervalStyle",
+        "is_superuser",
+        "server_encoding",
+        "server_version",
+        "session_authorization",
+        "standard_conforming_strings",
+        "TimeZone",
+    )
+}
+
+
+@functools.lru_cache(maxsize=32)
+def _current_settings_sql(count):
+    return "SELECT %s" % ", ".join(["current_setting(%s)"] * count)
+
+
+@functools.lru_cache(maxsize=32)
+def _set_configs_sql(count):
+    return "SELECT %s" % ", ".join(["set_config(%s, %s::text, true)"] * count)
+
+
 def apply_options(cursor, options):
     """Applies the given postgresql client options to the given cursor.
 
     Returns a dictionary with the old values if they changed."""
+    if not options:
+        return {}
+    old_values = {}
+    queried = []
+    for option in options:
+        name = _REPORTED_SETTINGS.get(option.lower())
+        old_value = name and cursor.connection.get_parameter_status(name)
+        if old_value is None:
+            queried.append(option)
+        else:
+            old_values[option] = old_value
+    if queried:
+        # fetch all the other current values at once
+        cursor.execute(_current_settings_sql(len(queried)), queried)
+        old_values.update(zip(queried, cursor.fetchone()))
     old_options = {}
+    new_options = []
     for option, value in options.items():
-        cursor.execute("SHOW %s" % option)
-        old_value = cursor.fetchall()[0][0]
+        old_value = old_values[option]
         if old_value != value:
-            cursor.execute("SET LOCAL %s TO %%s" % option, (value,))
             old_options[option] = old_value
+            new_options.extend((option, value))
+    if new_options:
+        # set all the changed options at once; set_config(..., true) is SET LOCAL
+        cursor.execute(_set_configs_sql(len(old_options)), new_options)
     return old_options
 
 
@@ -51,25 +102,31 @@ def db_transaction(**client_options):
         if inspect.isgeneratorfunction(meth):
             raise ValueError("Use db_transaction_generator for generator functions.")
 
+        meth_name = meth.__name__
+
         @remove_kwargs(["cur", "db"])
         @functools.wraps(meth)
         def _meth(self, *args, **kwargs):
-            options = getattr(self, "query_options", None) or {}
-            if meth.__name__ in options:
-                client_options = {**__client_options, **options[meth.__name__]}
+            options = getattr(self, "query_options", None)
+            if options and meth_name in options:
+                client_options = {**__client_options, **options[meth_name]}
             else:
                 client_options = __client_options
             if "cur" in kwargs and kwargs["cur"]:
                 cur = kwargs["cur"]
+                if not client_options:
+                    return meth(self, *args, **kwargs)
                 old_options = apply_options(cur, client_options)
                 ret = meth(self, *args, **kwargs)
-                apply_options(cur, old_options)
+                if old_options:
+                    apply_options(cur, old_options)
                 return ret
             else:
                 db = self.get_db()
                 try:
                     with db.transaction() as cur:
-                        apply_options(cur, client_options)
+                        if client_options:
+                            apply_options(cur, client_options)
                         return meth(self, *args, db=db, cur=cur, **kwargs)
                 finally:
                     self.put_db(db)
@@ -98,24 +155,31 @@ def db_transaction_generator(**client_options):
         if not inspect.isgeneratorfunction(meth):
             raise ValueError("Use db_transaction for non-generator functions.")
 
+        meth_name = meth.__name__
+
         @remove_kwargs(["cur", "db"])
         @functools.wraps(meth)
         def _meth(self, *args, **kwargs):
-            options = getattr(self, "query_options", None) or {}
-            if meth.__name__ in options:
-                client_options = {**__client_options, **options[meth.__name__]}
+            options = getattr(self, "query_options", None)
+            if options and meth_name in options:
+                client_options = {**__client_options, **options[meth_name]}
             else:
                 client_options = __client_options
             if "cur" in kwargs and kwargs["cur"]:
                 cur = kwargs["cur"]
+                if not client_options:
+                    yield from meth(self, *args, **kwargs)
+                    return
                 old_options = apply_options(cur, client_options)
                 yield from meth(self, *args, **kwargs)
-                apply_options(cur, old_options)
+                if old_options:
+                    apply_options(cur, old_options)
             else:
                 db = self.get_db()
                 try:
                     with db.transaction() as cur:
-                        apply_options(cur, client_options)
+                        if client_options:
+                            apply_options(cur, client_options)
                         yield from meth(self, *args, db=db, cur=cur, **kwargs)
                 finally:
                     self.put_db(db)
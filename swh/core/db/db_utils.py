@@ -440,6 +440,19 @@ def _split_sql(sql):
     return pre, post
 
 
+@functools.lru_cache(maxsize=256)
+def _split_values_sql(sql: bytes) -> Tuple[bytes, bytes]:
+    """Cached :func:`_split_sql`, returning the joined pre and post snippets."""
+    pre, post = _split_sql(sql)
+    return b"".join(pre), b"".join(post)
+
+
+@functools.lru_cache(maxsize=64)
+def _values_template(arity: int) -> bytes:
+    """Positional ``(%s, %s, ...)`` row template with *arity* placeholders."""
+    return b"(" + b",".join([b"%s"] * arity) + b")"
+
+
 def execute_values_generator(cur, sql, argslist, template=None, page_size=100):
     """Execute a statement using SQL ``VALUES`` with a sequence of parameters.
     Rows returned by the query are returned through a generator.
@@ -480,27 +493,60 @@ def execute_values_generator(cur, sql, argslist, template=None, page_size=100):
     # doesn't implement % on bytes.
     if not isinstance(sql, bytes):
         sql = sql.encode(pgencodings[cur.connection.encoding])
-    pre, post = _split_sql(sql)
+    pre_sql, post_sql = _split_values_sql(sql)
+    mogrify = cur.mogrify
 
     for page in _paginate(argslist, page_size=page_size):
         if template is None:
-            template = b"(" + b",".join([b"%s"] * len(page[0])) + b")"
-        parts = pre[:]
-        for args in page:
-            parts.append(cur.mogrify(template, args))
-            parts.append(b",")
-        parts[-1:] = post
-        cur.execute(b"".join(parts))
+            template = _values_template(len(page[0]))
+        values = b",".join([mogrify(template, args) for args in page])
+        cur.execute(pre_sql + values + post_sql)
+        yield from cur
+
+
+def execute_values_unnest(cur, sql, argslist, page_size=1000):
+    """Execute a statement with a sequence of parameters sent as column arrays.
+    Rows returned by the query are returned through a generator.
+    You need to consume the generator for the queries to be executed!
+
+    Unlike :func:`execute_values_generator`, rows are not rendered one by one
+    client-side: every page of *argslist* is transposed into one array per
+    column, each passed as a single query parameter.
+
+    :param cur: the cursor to use to execute the query.
+    :param sql: the query to execute. It must contain one positional ``%s``
+        placeholder per column, typically cast to an array type and expanded
+        with ``unnest``. Example: ``"INSERT INTO mytable (id, f1)
+        SELECT * FROM unnest(%s::bigint[], %s::text[])"``.
+    :param argslist: sequence of sequences with the arguments to send to the
+        query; all the items must have the same length, matching the number of
+        placeholders in *sql*.
+    :param page_size: maximum number of *argslist* items to include in every
+        statement. If there are more items the function will execute more than
+        one statement.
+    :raises ValueError: if the items of *argslist* do not all have the same
+        length.
+
+    After the execution of the function the `cursor.rowcount` property will
+    **not** contain a total result.
+    """
+    arity = None
+    for page in _paginate(argslist, page_size=page_size):
+        if arity is None:
+            arity = len(page[0])
+        if any(len(args) != arity for args in page):
+            raise ValueError("all the items of argslist must have the same length")
+        cur.execute(sql, [list(column) for column in zip(*page)])
         yield from cur
 
 
 def import_swhmodule(modname: str) -> Optional[ModuleType]:
     # TODO: move import_swhmodule in swh.core.config, but swh-scrubber needs to
     # be aware of that befaore it can happen...
-    if ":" in modname:
+    package, sep, cls = modname.partition(":")
+    if sep:
         # new style: look for the actual module in the 'swh.<package>.classes'
         # entrypoint
-        package, cls = modname.split(":", 1)
         modname, _ = get_swh_backend_module(swh_package=package, cls=cls)
 
     if not modname.startswith("swh."):
@@ -610,14 +656,38 @@ def initialize_database_for_module(
 
 
 def get_database_info(
-    conninfo: str,
+    db_or_conninfo: Union[str, pgconnection],
 ) -> Tuple[Optional[str], Optional[int], Optional[str]]:
-    """Get version, flavor and module of the db"""
-    dbmodule = swh_db_module(conninfo)
-    dbversion = swh_db_version(conninfo)
+    """Get version, flavor and module of the db
+
+    When given a connection info string, a single (autocommit) connection to
+    the database is used to retrieve all three values.
+    """
+    if isinstance(db_or_conninfo, pgconnection):
+        return _get_database_info(db_or_conninfo)
+
+    try:
+        with connect_to_conninfo(db_or_conninfo) as db:
+            try:
+                # so a failing query (e.g. missing table) does not abort the
+                # transaction for the following ones
+                db.autocommit = True
+                return _get_database_info(db)
+            finally:
+                db.close()
+    except Exception:
+        logger.exception("Could not get database info from `%s`", db_or_conninfo)
+        return (None, None, None)
+
+
+def _get_database_info(
+    db: pgconnection,
+) -> Tuple[Optional[str], Optional[int], Optional[str]]:
+    dbmodule = swh_db_module(db)
+    dbversion = swh_db_version(db)
     dbflavor = None
     if dbversion is not None:
-        dbflavor = swh_db_flavor(conninfo)
+        dbflavor = swh_db_flavor(db)
     return (dbmodule, dbversion, dbflavor)
 
 
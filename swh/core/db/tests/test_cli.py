@@ -617,6 +617,12 @@ version: 3
 """
     )
 
+    result = cli_runner.invoke(
+        swhdb, ["-C", cfgfile, "version", "--all", "--quiet", "test"]
+    )
+    assert_result(result)
+    assert result.output == "test:postgresql\t3\tdefault\ntest:cli2\t3\t-\n"
+
 
 @pytest.mark.init_version(version=1)
 def test_cli_swh_db_upgrade_from_config(
@@ -797,3 +803,51 @@ test:
     assert_result(result)
     assert swh_db_version(conninfo) == 6
     assert swh_db_version(conninfo2) == 6
+
+
+@pytest.mark.parametrize("command", ["init-admin", "init", "version", "upgrade"])
+def test_cli_swh_db_all_with_backend_reference(cli_runner, tmp_path, command):
+    cfgfile = tmp_path / "config.yml"
+    cfgfile.write_text("test:\n  cls: postgresql\n  db: service=test\n")
+
+    result = cli_runner.invoke(swhdb, ["-C", cfgfile, command, "-a", "test:postgresql"])
+    assert result.exit_code == 2, result.output
+    assert "cannot be used with the --all option" in result.output
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_cli_swh_db_run_all(jobs):
+    import click
+
+    from swh.core.cli.db import _run_all
+
+    ctx = click.Context(swhdb, obj={})
+    calls = []
+
+    def func(a, b):
+        assert click.get_current_context() is ctx
+        calls.append((a, b))
+        if a == 2:
+            raise ValueError(a)
+
+    with ctx.scope(cleanup=False), pytest.raises(ValueError, match="2"):
+        _run_all(ctx, func, ((i, i * 2) for i in range(5)), jobs=jobs)
+    if jobs == 1:
+        assert calls == [(0, 0), (1, 2), (2, 4)]
+    else:
+        assert sorted(calls) == [(i, i * 2) for i in range(5)]
+
+
+def test_cli_swh_db_dbname_does_not_read_config(
+    cli_runner, mock_get_entry_points, mocker, tmp_path
+):
+    """The config file is not loaded when the db connection string is given"""
+    cfgfile = tmp_path / "config.yml"
+    cfgfile.write_text("test: [not, a, valid: yaml")
+    init_admin = mocker.patch("swh.core.db.db_utils.init_admin_extensions")
+
+    result = cli_runner.invoke(
+        swhdb, ["-C", cfgfile, "init-admin", "test", "--dbname", "service=test"]
+    )
+    assert_result(result)
+    init_admin.assert_called_once_with("test:postgresql", "service=test")
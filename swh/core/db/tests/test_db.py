@@ -18,8 +18,8 @@ import psycopg2
 import pytest
 from pytest_postgresql import factories
 
-from swh.core.db import BaseDb
-from swh.core.db.common import db_transaction, db_transaction_generator
+from swh.core.db import BaseDb, value_as_pg_text
+from swh.core.db.common import apply_options, db_transaction, db_transaction_generator
 from swh.core.db.tests.conftest import function_scoped_fixture_check
 
 Converter = Callable[[Any], Any]
@@ -122,6 +122,23 @@ class TestIntEnum(IntEnum):
     bar = 2
 
 
+class TestIntEnumMissing(IntEnum):
+    foo = 1
+
+    @classmethod
+    def _missing_(cls, value):
+        member = int.__new__(cls, value)
+        member._name_ = f"unknown_{value}"
+        member._value_ = value
+        return member
+
+
+def test_value_as_pg_text_int_enum():
+    assert value_as_pg_text(TestIntEnum.bar) == "2"
+    assert value_as_pg_text(TestIntEnumMissing.foo) == "1"
+    assert value_as_pg_text(TestIntEnumMissing(5)) == "5"
+
+
 def now():
     return datetime.datetime.now(tz=datetime.timezone.utc)
 
@@ -308,6 +325,56 @@ def test_db_copy_to_thread_exception(db_with_data):
         db_with_data.copy_to(items, "test_table", COLUMNS)
 
 
+def test_db_copy_to_value_exception(db_with_data):
+    class Unrenderable:
+        def __str__(self):
+            raise ValueError("cannot render")
+
+    items = [{"i": 1}, {"i": Unrenderable()}]
+    with pytest.raises(ValueError, match="cannot render"):
+        db_with_data.copy_to(items, "test_table", ["i"])
+
+
+def test_db_context_manager(mocker):
+    mocker.patch.object(BaseDb, "adapt_conn")
+    pool = Mock()
+    pool.getconn.return_value = conn = Mock()
+
+    with BaseDb.from_pool(pool) as db:
+        assert db.conn is conn
+        pool.putconn.assert_not_called()
+
+    pool.putconn.assert_called_once_with(conn)
+
+
+def test_db_apply_options(db_with_data):
+    def show(cur, option):
+        cur.execute("SHOW %s" % option)
+        return cur.fetchone()[0]
+
+    with db_with_data.transaction() as cur:
+        initial = {
+            "statement_timeout": show(cur, "statement_timeout"),
+            "work_mem": show(cur, "work_mem"),
+            "application_name": show(cur, "application_name"),
+        }
+        options = {
+            "statement_timeout": "42s",
+            "work_mem": "42MB",
+            "application_name": "swh-test",
+        }
+        old_options = apply_options(cur, options)
+        assert old_options == initial
+        assert {option: show(cur, option) for option in options} == options
+
+        # nothing to change
+        assert apply_options(cur, {"work_mem": "42MB"}) == {}
+        assert apply_options(cur, {}) == {}
+
+        assert apply_options(cur, old_options) == options
+        assert {option: show(cur, option) for option in options} == initial
+
+
 def test_db_transaction(mocker):
     expected_cur = object()
 
@@ -11,6 +11,12 @@ import pytest
 
 from swh.core.cli.db import db as swhdb
 from swh.core.db import BaseDb
+from swh.core.db.db_utils import (
+    execute_values_unnest,
+    get_database_info,
+    get_sql_for_package,
+    now,
+)
 from swh.core.db.db_utils import (
     swh_db_module,
     swh_db_upgrade,
@@ -18,7 +24,6 @@ from swh.core.db.db_utils import (
     swh_db_versions,
     swh_set_db_module,
 )
-from swh.core.db.db_utils import get_database_info, get_sql_for_package, now
 from swh.core.db.db_utils import parse_dsn_or_dbname as parse_dsn
 from swh.core.tests.test_cli import assert_result
 
@@ -257,3 +262,29 @@ INSERT INTO origin(url, hash)
 VALUES ('https://nowhere.com', hash_sha1('https://nowhere.com'))
             """
             )
+
+
+def test_db_utils_execute_values_unnest(postgresql):
+    rows = [(i, f"value {i}") for i in range(5)]
+    with postgresql.cursor() as cur:
+        cur.execute("create table unnest_test (id bigint, value text)")
+        results = execute_values_unnest(
+            cur,
+            "insert into unnest_test (id, value) "
+            "select * from unnest(%s::bigint[], %s::text[]) returning id, value",
+            rows,
+            page_size=2,
+        )
+        assert list(results) == rows
+
+        cur.execute("select id, value from unnest_test order by id")
+        assert cur.fetchall() == rows
+
+        with pytest.raises(ValueError, match="same length"):
+            list(
+                execute_values_unnest(
+                    cur,
+                    "select * from unnest(%s::bigint[], %s::text[])",
+                    [(1, "one"), (2,)],
+                )
+            )
@@ -456,6 +456,8 @@ def mock_import_module(request, mocker, datadir):
 
 @pytest.fixture()
 def mock_get_entry_points(request, mocker, datadir, mock_import_module):
+    from swh.core.config import _entry_points_for
+
     mock = mocker.MagicMock
 
     def get_entry_points_mocker(group):
@@ -488,7 +490,10 @@ def mock_get_entry_points(request, mocker, datadir, mock_import_module):
                     entrypoints[entry.name] = ep
         return entrypoints
 
-    return mocker.patch("swh.core.config.get_entry_points", get_entry_points_mocker)
+    # entry points are cached per package, do not mix them with the real ones
+    _entry_points_for.cache_clear()
+    yield mocker.patch("swh.core.config.get_entry_points", get_entry_points_mocker)
+    _entry_points_for.cache_clear()
 
 
 # for bw compat
@@ -125,6 +125,58 @@ def test_read_no_default_conf(swh_config):
     assert actual_config == expected_config
 
 
+def test_read_cached(swh_config, mocker):
+    load = mocker.spy(yaml, "load")
+    res = config.read(str(swh_config), default_conf)
+    assert res == parsed_conffile
+    res2 = config.read(str(swh_config), default_conf)
+    assert load.call_count == 1
+    assert res2 == res
+    assert res2 is not res
+
+    # mutating the returned config must not alter the cached one
+    res["a"] = 42
+    assert config.read(str(swh_config), default_conf) == parsed_conffile
+    assert load.call_count == 1
+
+    # a modified file is parsed again
+    swh_config.write_text("a: 12\n")
+    os.utime(swh_config, ns=(0, 0))
+    assert config.read(str(swh_config)) == {"a": 12}
+    assert config._RAW_CACHE[str(swh_config)][1] == {"a": 12}
+
+
+def test_read_cached_replaced_same_size_and_mtime(tmp_path):
+    conffile = tmp_path / "config.yml"
+    conffile.write_text("db: service=aaa\n")
+    st = conffile.stat()
+    assert config.read(str(conffile)) == {"db": "service=aaa"}
+
+    # replace the file with one of the same size and modification time, as done
+    # by e.g. 'cp -p' or 'rsync -t'
+    newfile = tmp_path / "config.yml.new"
+    newfile.write_text("db: service=bbb\n")
+    os.utime(newfile, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.replace(newfile, conffile)
+    assert conffile.stat().st_size == st.st_size
+    assert conffile.stat().st_mtime_ns == st.st_mtime_ns
+
+    assert config.read(str(conffile)) == {"db": "service=bbb"}
+
+
+def test_read_raw_config_cached_nested(tmp_path):
+    conffile = tmp_path / "nested.yml"
+    conffile.write_text("storage:\n  cls: remote\n  urls: [a, b]\n")
+    expected = {"storage": {"cls": "remote", "urls": ["a", "b"]}}
+
+    conf = config.read_raw_config(str(conffile))
+    assert conf == expected
+    conf["storage"]["urls"].append("c")
+    conf["storage"]["cls"] = "memory"
+
+    assert config.read_raw_config(str(conffile)) == expected
+
+
 def test_read_empty_file():
     # when
     res = config.read(None, default_conf)
@@ -204,6 +256,19 @@ def test_priority_read_empty_conf_nonexist(swh_config):
     assert res == parsed_default_conf
 
 
+def test_priority_read_home_changed(swh_config, tmp_path, monkeypatch):
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    assert config.priority_read(["~/swh.yml"], default_conf) == parsed_default_conf
+
+    shutil.copy(swh_config, home / "swh.yml")
+    monkeypatch.setenv("HOME", str(swh_config.parent))
+    assert config.priority_read(["~/swh.yml"]) == {}
+    monkeypatch.setenv("HOME", str(home))
+    assert config.priority_read(["~/swh.yml"], default_conf) == parsed_conffile
+
+
 def test_swh_config_paths():
     res = config.swh_config_paths("foo/bar.yml")
 
@@ -363,3 +428,67 @@ def test_load_from_envvar_with_default_config(swh_config, monkeypatch):
     )
 
     assert actual_config == expected_config
+
+
+def test_list_db_config_entries():
+    cfg = {
+        "storage": {
+            "cls": "pipeline",
+            "steps": [
+                {"cls": "masking", "masking_db": "service=masking"},
+                {"cls": "postgresql", "db": "service=storage"},
+            ],
+        },
+        "scheduler": {"cls": "postgresql", "db": "service=scheduler"},
+        "other": {"key": "value"},
+    }
+    assert list(config.list_db_config_entries(cfg)) == [
+        (
+            "storage",
+            "storage.steps.0",
+            {"cls": "masking", "masking_db": "service=masking"},
+            "service=masking",
+        ),
+        (
+            "storage",
+            "storage.steps.1",
+            {"cls": "postgresql", "db": "service=storage"},
+            "service=storage",
+        ),
+        (
+            "scheduler",
+            "scheduler",
+            {"cls": "postgresql", "db": "service=scheduler"},
+            "service=scheduler",
+        ),
+    ]
+    assert list(config.list_db_config_entries(cfg, only_module="scheduler")) == [
+        (
+            "scheduler",
+            "scheduler",
+            {"cls": "postgresql", "db": "service=scheduler"},
+            "service=scheduler",
+        ),
+    ]
+    assert list(config.list_db_config_entries(cfg, only_module="other")) == []
+    assert list(config.list_db_config_entries(cfg, only_module="missing")) == []
+
+
+def test_list_db_config_entries_nested():
+    cfg = {
+        "max_content_size": 42,
+        "storage": {
+            "cls": "postgresql",
+            "objstorage": {"cls": "db", "objstorage_db": "service=objstorage"},
+            "db": "service=storage",
+        },
+    }
+    assert list(config.list_db_config_entries(cfg)) == [
+        (
+            "storage",
+            "storage.objstorage",
+            {"cls": "db", "objstorage_db": "service=objstorage"},
+            "service=objstorage",
+        ),
+        ("storage", "storage", cfg["storage"], "service=storage"),
+    ]